@@ -7,95 +7,499 @@ Run an interactive Question-Answering (QA) chatbot session that integrates multi
 - Implements Retrieval-Augmented Generation (RAG) for enhanced context-driven answers.
 """
 
+import atexit
+import collections
+import functools
+import hashlib
 import logging
 import re
+import sqlite3
 import groq
 from groq import Groq
+import httpx
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import readline
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime, timezone
+from urllib.parse import urlparse
 import finnhub
 import sys
-import ast
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson decodes several times faster than the json module; fall back to the latter if it is not installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 ################################################################################
-# Core LLM and API Functions
+# Caching Helpers
 ################################################################################
 
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
-finnhub_client = finnhub.Client(
-    api_key=os.environ.get("FINN_API_KEY"),
+def ttl_cache(ttl, maxsize=512, key=None):
+    '''
+    Decorator that memoizes a function's return values for `ttl` seconds.
+    `key` optionally maps the call arguments to the cache key, e.g. to normalize user input.
+    Once `maxsize` entries are stored, the oldest entry is evicted.
+
+    >>> @ttl_cache(60)
+    ... def square(x):
+    ...     print("computing")
+    ...     return x * x
+    >>> square(3)
+    computing
+    9
+    >>> square(3)
+    9
+    '''
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            with lock:
+                entry = cache.get(cache_key)
+                if entry and time.monotonic() - entry[0] < ttl:
+                    return entry[1]
+            value = func(*args, **kwargs)
+            with lock:
+                cache.pop(cache_key, None)
+                if len(cache) >= maxsize:
+                    cache.pop(next(iter(cache)))
+                cache[cache_key] = (time.monotonic(), value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+# Answers include live quotes, so they are only reused for a short while
+ANSWER_CACHE_TTL = 10 * 60
+
+# Words that can be added or dropped without changing what is being asked.
+# Negations and action words such as "buy" or "sell" are never in this list.
+STOPWORDS = frozenset({
+    "a", "an", "the", "is", "are", "am", "be", "do", "does", "i", "me", "my", "we", "our", "you", "your",
+    "it", "its", "s", "please", "to", "of", "for", "on", "in", "about",
+})
+
+class ResponseCache:
+    '''
+    Caches chatbot answers and serves them for later queries about the same tickers that differ only in
+    letter case, punctuation and stopwords.
+    Any other change to the wording, however small, is a different question and misses the cache.
+    Entries expire after `ttl` seconds so answers do not outlive the market data they were built from,
+    and the least recently used entry is evicted once `maxsize` entries are stored.
+
+    >>> cache = ResponseCache()
+    >>> cache.add("Is Tesla a good buy?", "Yes.", ["TSLA"])
+    >>> cache.get("is tesla good buy", ["TSLA"])
+    'Yes.'
+    >>> cache.get("Is Apple a good buy?", ["AAPL"]) is None
+    True
+    >>> question = "Based on the latest earnings and analyst ratings, should I buy Tesla stock this week?"
+    >>> cache.add(question, "Yes, buy.", ["TSLA"])
+    >>> cache.get(question.replace("buy", "sell"), ["TSLA"]) is None
+    True
+    >>> cache.get(question.replace("buy", "not buy"), ["TSLA"]) is None
+    True
+    '''
+
+    def __init__(self, ttl=ANSWER_CACHE_TTL, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text, tickers):
+        words = tuple(word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS)
+        return tuple(tickers), words
+
+    def get(self, text, tickers=()):
+        key = self._key(text, tickers)
+        if not key[1]:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, response = entry
+            if time.monotonic() - created >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def add(self, text, response, tickers=(), age=0):
+        key = self._key(text, tickers)
+        if not key[1]:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() - age, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+response_cache = ResponseCache()
+
+# Fetched article text and final answers are also kept on disk, so repeat queries across sessions skip the pipeline
+CACHE_DB_PATH = os.getenv("CHATBOT_CACHE_DB", "chatbot_cache.db")
+ARTICLE_CACHE_TTL = 60 * 60
+_cache_db = None
+_cache_db_lock = threading.Lock()
+
+def _open_cache_db():
+    "Opens the cache database on first use, dropping expired rows. Callers must hold _cache_db_lock."
+    global _cache_db
+    if _cache_db is None:
+        db = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+        # WAL with relaxed syncing avoids an fsync per commit; losing the newest cache rows in a crash is harmless
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA temp_store=MEMORY")
+        # Reading pages through a memory map and a larger page cache saves a read syscall per page on cache lookups
+        db.execute("PRAGMA mmap_size=268435456")
+        db.execute("PRAGMA cache_size=-65536")
+        db.execute("CREATE TABLE IF NOT EXISTS articles (url TEXT PRIMARY KEY, content TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS answers "
+            "(query_hash TEXT PRIMARY KEY, query TEXT NOT NULL, tickers TEXT NOT NULL, answer TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        db.execute("DELETE FROM articles WHERE fetched_at < ?", (time.time() - ARTICLE_CACHE_TTL,))
+        db.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - ANSWER_CACHE_TTL,))
+        db.commit()
+        # Answers from earlier sessions also serve the same question asked with different stopwords or punctuation
+        for query, tickers, answer, created_at in db.execute("SELECT query, tickers, answer, created_at FROM answers"):
+            response_cache.add(query, answer, json_loads(tickers), age=time.time() - created_at)
+        _cache_db = db
+        atexit.register(_close_cache_db)
+    return _cache_db
+
+def _close_cache_db():
+    "Refreshes the query planner statistics and closes the cache database."
+    global _cache_db
+    with _cache_db_lock:
+        if _cache_db is not None:
+            try:
+                _cache_db.execute("PRAGMA optimize")
+                _cache_db.close()
+            except sqlite3.Error as e:
+                logging.warning("Could not close the cache: %s", e)
+            _cache_db = None
+
+def _read_cache(sql, params):
+    "Runs a query against the cache database and returns all matching rows, or no rows if the cache is unreadable."
+    try:
+        with _cache_db_lock:
+            return _open_cache_db().execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        logging.warning("Could not read the cache: %s", e)
+        return []
+
+def _write_cache(sql, rows):
+    "Writes all rows to the cache database in a single transaction."
+    try:
+        with _cache_db_lock:
+            db = _open_cache_db()
+            with db:
+                db.executemany(sql, rows)
+    except sqlite3.Error as e:
+        logging.warning("Could not write to the cache: %s", e)
+
+def load_cached_articles(urls):
+    "Returns a dict mapping each URL fetched within the last hour to its article text."
+    rows = _read_cache(
+        f"SELECT url, content FROM articles WHERE url IN ({', '.join('?' * len(urls))}) AND fetched_at >= ?",
+        (*urls, time.time() - ARTICLE_CACHE_TTL),
+    )
+    return dict(rows)
+
+def store_articles(articles):
+    "Saves (url, content) pairs to the on-disk cache."
+    now = time.time()
+    _write_cache("INSERT OR REPLACE INTO articles VALUES (?, ?, ?)", [(url, content, now) for url, content in articles])
+
+def _query_hash(text):
+    "Hashes the words of the query, ignoring case and punctuation, so retyped questions share a cache entry."
+    return hashlib.blake2b(" ".join(re.findall(r"\w+", text.lower())).encode(), digest_size=16).hexdigest()
+
+def load_cached_answer(text):
+    "Returns the answer given to the same question within ANSWER_CACHE_TTL seconds, or None."
+    rows = _read_cache(
+        "SELECT answer FROM answers WHERE query_hash = ? AND created_at >= ?",
+        (_query_hash(text), time.time() - ANSWER_CACHE_TTL),
+    )
+    return rows[0][0] if rows else None
+
+def store_answer(text, answer, tickers):
+    "Saves the answer to a question about the given tickers to the on-disk cache."
+    _write_cache(
+        "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)",
+        [(_query_hash(text), text, json.dumps(list(tickers)), answer, time.time())],
     )
+
+################################################################################
+# Core LLM and API Functions
+################################################################################
+
+# The API clients are built on first use, so importing this module for its helpers needs no API keys
+_client = None
+_finnhub_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    "Returns the shared Groq client, creating it on first use."
+    global _client
+    with _client_lock:
+        if _client is None:
+            # HTTP/2 lets concurrent LLM requests share one kept-alive connection
+            _client = Groq(
+                api_key=os.environ.get("GROQ_API_KEY"),
+                http_client=httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60),
+                ),
+            )
+        return _client
+
+def get_finnhub_client():
+    "Returns the shared Finnhub client, creating it on first use."
+    global _finnhub_client
+    with _client_lock:
+        if _finnhub_client is None:
+            _finnhub_client = finnhub.Client(
+                api_key=os.environ.get("FINN_API_KEY"),
+                )
+        return _finnhub_client
+
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
 
+# One pooled session for all Google and article requests, so connections and TLS handshakes are reused
+http_session = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.3))
+http_session.mount("https://", _http_adapter)
+http_session.mount("http://", _http_adapter)
+http_session.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+})
+
 #Groq Functions
-def run_llm(system, user, model='llama3-8b-8192', seed=None):
+def run_llm(system, user, model='llama3-8b-8192', seed=None, stream=False):
     '''
     This is a helper function for all the uses of LLMs in this file.
+    If `stream` is True, the response is written to stdout as it is generated and then returned in full.
     '''
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                'role': 'system',
-                'content': system,
-            },
-            {
-                "role": "user",
-                "content": user,
-            }
-        ],
-        model=model,
-        seed=seed,
-    )
-    return chat_completion.choices[0].message.content
+    messages = [
+        {
+            'role': 'system',
+            'content': system,
+        },
+        {
+            "role": "user",
+            "content": user,
+        }
+    ]
+    if not stream:
+        chat_completion = get_client().chat.completions.create(
+            messages=messages,
+            model=model,
+            seed=seed,
+        )
+        return chat_completion.choices[0].message.content
 
-def summarize_text(text, seed=None):
-    "Summarizes the input text into a paragraph and keeps relevant stock information"
-    system = '''Summarize the input text below.
-    Limit the summary to 1 paragraph.
-    Use an advanced reading level similar to the input text, and ensure that all people, places, and other proper names and dates are included in the summary.
-    When possible, keep buy/hold/sell ratings, challenges the company faces, and financial information in the summary.
-    Only include the summary.'''
-    return run_llm(system, text, seed=seed)
+    parts = []
+    for chunk in get_client().chat.completions.create(messages=messages, model=model, seed=seed, stream=True):
+        content = chunk.choices[0].delta.content if chunk.choices else None
+        if content:
+            sys.stdout.write(content)
+            sys.stdout.flush()
+            parts.append(content)
+    sys.stdout.write("\n")
+    return "".join(parts)
+
+# Cookie banners and sign-in prompts that often lead scraped article text. Only the banner's own sentence is removed,
+# from its opening phrase up to the next full stop that ends a sentence, so decimals like 3.5% are not cut through.
+_BOILERPLATE_RE = re.compile(
+    r"\b(?:we use cookies|this (?:web)?site uses cookies|accept (?:all )?cookies|subscribe (?:now )?to (?:continue|keep reading)"
+    r"|sign in to (?:continue|keep reading|read))\b.*?(?:[.!?](?=\s|$)|$)\s*",
+    re.IGNORECASE,
+)
 
+def strip_boilerplate(text):
+    '''
+    Removes cookie-banner, subscription, and sign-in sentences from scraped article text.
+
+    >>> strip_boilerplate("We use cookies to improve your experience. Apple shares rose 3% on Monday.")
+    'Apple shares rose 3% on Monday.'
+    >>> strip_boilerplate("Revenue rose 3.5% as more users subscribe to the ad tier. Margins improved.")
+    'Revenue rose 3.5% as more users subscribe to the ad tier. Margins improved.'
+    >>> strip_boilerplate("Mondelez sells more cookies in China, a sign in favor of growth. Subscribe to continue reading.")
+    'Mondelez sells more cookies in China, a sign in favor of growth.'
+    '''
+    return _BOILERPLATE_RE.sub("", text).strip()
+
+# Well-known companies resolved without asking the LLM.
+# Names that double as everyday words (visa, meta, oracle, micron, intel, ...) are left out, so the LLM resolves them.
+COMPANY_TICKERS = {
+    "apple": "AAPL", "microsoft": "MSFT", "amazon": "AMZN", "google": "GOOGL", "alphabet": "GOOGL",
+    "facebook": "META", "tesla": "TSLA", "nvidia": "NVDA", "netflix": "NFLX",
+    "amd": "AMD", "ibm": "IBM", "salesforce": "CRM", "adobe": "ADBE",
+    "cisco": "CSCO", "qualcomm": "QCOM", "broadcom": "AVGO", "texas instruments": "TXN",
+    "applied materials": "AMAT", "asml": "ASML", "tsmc": "TSM", "taiwan semiconductor": "TSM",
+    "super micro": "SMCI", "supermicro": "SMCI", "dell": "DELL", "servicenow": "NOW", "crowdstrike": "CRWD",
+    "palantir": "PLTR", "shopify": "SHOP", "lyft": "LYFT",
+    "airbnb": "ABNB", "spotify": "SPOT", "pinterest": "PINS", "reddit": "RDDT", "paypal": "PYPL",
+    "coinbase": "COIN", "robinhood": "HOOD", "sofi": "SOFI", "mastercard": "MA",
+    "american express": "AXP", "jpmorgan": "JPM", "jp morgan": "JPM", "goldman sachs": "GS",
+    "morgan stanley": "MS", "bank of america": "BAC", "wells fargo": "WFC", "citigroup": "C",
+    "blackrock": "BLK", "charles schwab": "SCHW", "berkshire hathaway": "BRK.B", "berkshire": "BRK.B",
+    "walmart": "WMT", "costco": "COST", "home depot": "HD", "starbucks": "SBUX", "mcdonald's": "MCD",
+    "mcdonalds": "MCD", "coca-cola": "KO", "coca cola": "KO", "pepsico": "PEP", "pepsi": "PEP",
+    "nike": "NKE", "disney": "DIS", "comcast": "CMCSA", "verizon": "VZ", "at&t": "T", "t-mobile": "TMUS",
+    "boeing": "BA", "lockheed martin": "LMT", "caterpillar": "CAT", "honeywell": "HON", "fedex": "FDX",
+    "delta air lines": "DAL", "general motors": "GM", "rivian": "RIVN", "toyota": "TM",
+    "exxon": "XOM", "exxonmobil": "XOM", "exxon mobil": "XOM", "pfizer": "PFE",
+    "moderna": "MRNA", "merck": "MRK", "eli lilly": "LLY", "abbvie": "ABBV", "johnson & johnson": "JNJ",
+    "unitedhealth": "UNH", "novo nordisk": "NVO", "gamestop": "GME", "alibaba": "BABA", "baidu": "BIDU",
+    "sony": "SONY",
+}
+# Tickers that are also ordinary words or abbreviations when written in capitals
+_KNOWN_TICKERS = frozenset(COMPANY_TICKERS.values()) - {"NOW", "CAT", "SHOP", "SPOT", "PINS", "COIN", "HOOD", "MA", "HD"}
+_TICKER_RE = re.compile(r"\b[A-Z]{2,5}\b")
+_COMPANY_RE = re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, sorted(COMPANY_TICKERS, key=len, reverse=True))))
+# Words that phrase a question about stocks; a query made only of these and known names is resolved locally
+_QUERY_WORDS = frozenset({
+    "a", "an", "the", "and", "or", "of", "in", "on", "for", "to", "s", "i", "my", "me", "we", "it", "its",
+    "is", "are", "do", "does", "can", "will", "would", "should", "what", "which", "how", "tell", "about", "compare",
+    "buy", "sell", "hold", "good", "better", "best", "than", "vs", "versus", "stock", "stocks", "shares", "now",
+})
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def find_known_tickers(text):
+    '''
+    Finds well-known companies mentioned in the text by ticker or by name and returns their tickers in order of appearance.
+    Returns an empty list unless every other word of the text only phrases the question, so that any query naming
+    another company, a news source, or anything else is left for the LLM to resolve as a whole.
+
+    >>> find_known_tickers("Is AAPL a better buy than Tesla?")
+    ['AAPL', 'TSLA']
+    >>> find_known_tickers("should i buy apple or amazon?")
+    ['AAPL', 'AMZN']
+    >>> find_known_tickers("Is Tesla a better buy than Lucid or Zoom?")
+    []
+    >>> find_known_tickers("should i buy intel or amd?")
+    []
+    >>> find_known_tickers("should i buy apple or samsung?")
+    []
+    >>> find_known_tickers("how is meta doing vs google")
+    []
+    >>> find_known_tickers("amazon vs walmart vs target")
+    []
+    >>> find_known_tickers("Is Nvidia news good for AMD?")
+    []
+    >>> find_known_tickers("What does Apple news mean for Microsoft stock?")
+    []
+    >>> find_known_tickers("Does Google Finance recommend buy for Nvidia?")
+    []
+    >>> find_known_tickers("How will H-1B visa reform affect hiring?")
+    []
+    >>> find_known_tickers("Which AI stocks should I buy?")
+    []
+    '''
+    # Blank out the known names and tickers, then check that nothing but question words is left
+    masked = list(text)
+    matches = [match for match in _TICKER_RE.finditer(text) if match.group() in _KNOWN_TICKERS]
+    tickers = [(match.start(), match.group()) for match in matches]
+    for match in _COMPANY_RE.finditer(text.lower()):
+        matches.append(match)
+        tickers.append((match.start(), COMPANY_TICKERS[match.group()]))
+    for match in matches:
+        masked[match.start():match.end()] = " " * (match.end() - match.start())
+    if any(word not in _QUERY_WORDS for word in _WORD_RE.findall("".join(masked).lower())):
+        return []
+    return list(dict.fromkeys(ticker for _, ticker in sorted(tickers)))
+
+@ttl_cache(24 * 60 * 60, key=lambda input, seed=None: (input.strip(), seed))
 def get_popular_symbol(input, seed=None):
     '''
     Identifies the company's stock ticker based on the user's query.
     If the input lacks a company name, returns 'None'
     Prioritizes common stocks from NASDAQ and NYSE.
+    The tickers are returned as a JSON array; use parse_tickers to convert them to a list.
     Example:
     >>> get_popular_symbol("Apple")
-    "['AAPL']"
+    '["AAPL"]'
     >>> get_popular_symbol("Tesla")
-    "['TSLA']"
+    '["TSLA"]'
     >>> get_popular_symbol("Microsoft")
-    "['MSFT']"
+    '["MSFT"]'
     >>> get_popular_symbol("Is Tesla a good buy?")
-    "['TSLA']"
+    '["TSLA"]'
     >>> get_popular_symbol("Is Google better than Amazon, Microsoft, and Apple?")
-    "['GOOGL', 'AMZN', 'MSFT', 'AAPL']"
+    '["GOOGL", "AMZN", "MSFT", "AAPL"]'
     >>> get_popular_symbol("")
     'None'
     '''
     if input=="":
         return 'None'
+    # Skip the LLM round-trip when the query already names well-known companies or tickers
+    known_tickers = find_known_tickers(input)
+    if known_tickers:
+        return json.dumps(known_tickers)
     system = """Identify what company the user is interested in based on the query below.
     Prioritize common stocks from NASDAQ and NYSE.
     If no specific company or tickers are included, only give at most 2 companies that relate to the query.
     Do not include any extra details, opinions, or unecessary explanations.
-    Return the stock tickers of the companies as a python list.
+    Return only a JSON array of the stock ticker strings, nothing else.
     If only one company is in the query return the ticker for that one company.
     Examples: 
-    "Is Tesla a good buy?" A good response is ['TSLA'].
-    "If I think LLMs are good for the future, which stocks should I buy?" A good response is ['APPL', 'MSFT']
-    "Is Google better than Amazon, Microsoft, and Apple" A good response is ['GOOGL', 'AMZN', 'MSFT', 'AAPL']
+    "Is Tesla a good buy?" A good response is ["TSLA"].
+    "If I think LLMs are good for the future, which stocks should I buy?" A good response is ["AAPL", "MSFT"]
+    "Is Google better than Amazon, Microsoft, and Apple" A good response is ["GOOGL", "AMZN", "MSFT", "AAPL"]
+    """
+    return run_llm(system, input, seed=seed).strip()
+
+def parse_tickers(text):
+    '''
+    Converts the JSON array returned by get_popular_symbol into a list of tickers.
+    Prose, code fences, or Python-style quotes around the array are tolerated; anything else yields an empty list.
+
+    >>> parse_tickers('["AAPL", "MSFT"]')
+    ['AAPL', 'MSFT']
+    >>> parse_tickers("The tickers are ['TSLA'].")
+    ['TSLA']
+    >>> parse_tickers('None')
+    []
+    '''
+    try:
+        tickers = json_loads(text)
+    except ValueError:
+        # Retry once on just the bracketed array
+        start, end = text.find("["), text.rfind("]")
+        try:
+            tickers = json_loads(text[start:end + 1].replace("'", '"')) if 0 <= start < end else None
+        except ValueError:
+            tickers = None
+    if not isinstance(tickers, list):
+        return []
+    return [ticker.strip().upper() for ticker in tickers if isinstance(ticker, str) and ticker.strip()]
+
+@ttl_cache(60)
+def fetch_quote(ticker):
+    """
+    Fetches the raw Finnhub quote for a stock ticker, cached for 60 seconds.
     """
-    return run_llm(system, input, seed=seed)
+    return get_finnhub_client().quote(ticker)
 
 def get_quote(ticker, mock_data=None):
     """
@@ -114,7 +518,7 @@ def get_quote(ticker, mock_data=None):
     'Current price: 150.0, Change: 5.0, Percent change: 3.45%, High price of the day: 155.0, Low price of the day: 140.0, Open price of the day: 145.0, Previous close price: 145.0'
     """
     # Use mock data if provided, otherwise call the API
-    quote = mock_data if mock_data else finnhub_client.quote(ticker)
+    quote = dict(mock_data if mock_data else fetch_quote(ticker))
     # Calculate change and percent change
     quote['d'] = round(quote['c'] - quote['pc'], 2)  # Change = current price - previous close price
     quote['dp'] = round((quote['d'] / quote['pc']) * 100, 2)  # Percent change
@@ -130,29 +534,38 @@ def get_quote(ticker, mock_data=None):
     )
     return output
 
+@ttl_cache(60)
 def get_recommendations(ticker):
     """
     Gets stock recommendation trends for a given stock ticker using Finnhub API and returns it as a formatted string.
     """
-    trends = finnhub_client.recommendation_trends(ticker)
-    # Format the output string
-    output = ""
-    for trend in trends:
-        output += (
-            f"Period: {trend['period']}, "
-            f"Strong Buy: {trend['strongBuy']}, "
-            f"Buy: {trend['buy']}, "
-            f"Hold: {trend['hold']}, "
-            f"Sell: {trend['sell']}, "
-            f"Strong Sell: {trend['strongSell']}\n"
-        )
-    return output.strip()
+    trends = get_finnhub_client().recommendation_trends(ticker)
+    # Format the output string, one line per period
+    return "\n".join(
+        f"Period: {trend['period']}, "
+        f"Strong Buy: {trend['strongBuy']}, "
+        f"Buy: {trend['buy']}, "
+        f"Hold: {trend['hold']}, "
+        f"Sell: {trend['sell']}, "
+        f"Strong Sell: {trend['strongSell']}"
+        for trend in trends
+    )
 
 
 ################################################################################
 # Google and Article Processing Functions
 ################################################################################
 
+PREFERRED_DOMAINS = ["finance.yahoo.com", "bloomberg.com", "morningstar.com", "cnbc.com", "seekingalpha.com", "nasdaq.com"]
+BLACKLISTED_DOMAINS = ["investors.com", "marketwatch.com", "reuters.com", "motleyfool.com"]
+
+# Compiled once so filtering and sorting results is a single regex scan per link
+_BLACKLIST_RE = re.compile("|".join(map(re.escape, BLACKLISTED_DOMAINS)))
+_PREFERRED_HOST_RE = re.compile(r"(?:^|\.)(?:%s)$" % "|".join(map(re.escape, PREFERRED_DOMAINS)))
+
+# Sort key for results without a usable publish date, placing them after dated ones
+_UNDATED = datetime.min
+
 def google_search(query, api_key, cse_id, num_results=5, date_restrict="m1"):
     """
     Perform a Google Custom Search for articles based on the query.
@@ -171,13 +584,10 @@ def google_search(query, api_key, cse_id, num_results=5, date_restrict="m1"):
         "num": num_results,
         "dateRestrict": date_restrict  # Filter results based on recency
        }
-    preferred_domains = ["finance.yahoo.com", "bloomberg.com", "morningstar.com", "cnbc.com", "seekingalpha.com", "nasdaq.com"]
-    blacklist = ["investors.com", "marketwatch.com", "reuters.com", "motleyfool.com"]
-
     try:
-        response = requests.get(search_url, params=params, timeout=10)
+        response = http_session.get(search_url, params=params, timeout=10)
         response.raise_for_status()
-        results = response.json().get("items", [])
+        results = json_loads(response.content).get("items", [])
 
         # Filter out blacklisted domains
         filtered_results = [
@@ -187,99 +597,139 @@ def google_search(query, api_key, cse_id, num_results=5, date_restrict="m1"):
                 "date": item.get("pagemap", {}).get("metatags", [{}])[0].get("article:published_time")
             }
             for item in results
-            if all(domain not in item.get("link", "") for domain in blacklist)
+            if not _BLACKLIST_RE.search(item.get("link", ""))
         ]
 
-        # Validate and parse dates
+        # Validate dates and build each sort key once: preferred domains first, then newest
+        keyed_results = []
         for result in filtered_results:
             date_str = result.get("date")
+            published = _UNDATED
             try:
                 if date_str:
-                    result["date"] = datetime.fromisoformat(date_str).isoformat()
+                    published = datetime.fromisoformat(date_str).replace(tzinfo=None)
                 else:
                     result["date"] = None  # Handle missing dates
             except ValueError:
-                logging.warning(f"Invalid date format for article: {result}")
+                logging.warning("Invalid date format for article: %s", result)
                 result["date"] = None
-            
-        # Sort results: prioritize by preferred domains and then by date
-        def sort_key(result):
-            in_preferred = any(domain in result.get("link", "") for domain in preferred_domains)
-            date = datetime.fromisoformat(result["date"]).replace(tzinfo=None) if result.get("date") else datetime.min
-            return (in_preferred, date)
+            in_preferred = bool(_PREFERRED_HOST_RE.search(urlparse(result.get("link") or "").hostname or ""))
+            keyed_results.append(((in_preferred, published), result))
 
-        sorted_results = sorted(filtered_results, key=sort_key, reverse=True)
-        return sorted_results
+        keyed_results.sort(key=lambda keyed: keyed[0], reverse=True)
+        return [result for _, result in keyed_results]
 
     except Exception as e:
-        logging.error(f"Error during Google Search: {e}")
+        logging.error("Error during Google Search: %s", e)
         return []
 
+# lxml parses several times faster than Python's html.parser; fall back to the latter if it is not installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# Only <p> elements are used, so skip building the rest of the document tree
+_PARAGRAPHS_ONLY = SoupStrainer("p")
+
+# Article bodies are cut to a short excerpt, so the lede near the top of the page is all that is needed
+MAX_ARTICLE_BYTES = 128 * 1024
+
 def fetch_article_content(url):
     """
     Fetch and extract readable content from the given URL.
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        with http_session.get(url, timeout=(5, 10), stream=True) as response:
+            response.raise_for_status()
+            # PDFs, images, and other downloads have no paragraphs to extract, so skip reading their bodies.
+            # Pages without a Content-Type are still parsed, since many servers omit it for HTML.
+            content_type = response.headers.get("content-type", "").lower()
+            if content_type and "html" not in content_type:
+                logging.info("Skipping non-HTML content from %s: %s", url, content_type)
+                return None
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(16384):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_ARTICLE_BYTES:
+                    break
+            # Only trust an explicit charset; otherwise let the parser read the page's <meta> tag
+            has_charset = "charset" in content_type
+            encoding = response.encoding if has_charset else None
+        soup = BeautifulSoup(b"".join(chunks), HTML_PARSER, parse_only=_PARAGRAPHS_ONLY, from_encoding=encoding)
         paragraphs = soup.find_all("p")
         content = " ".join(p.get_text() for p in paragraphs)
         return content if content.strip() else None
     except requests.exceptions.RequestException as e:
-        logging.warning(f"Error fetching content from {url}: {e}")
+        logging.warning("Error fetching content from %s: %s", url, e)
         return None
 
+def fetch_articles(links):
+    """
+    Fetch the readable content of several URLs concurrently, with None for any that could not be retrieved.
+    Pages fetched within the last hour are read from the on-disk cache, and new pages are saved to it in one transaction.
+    """
+    contents = load_cached_articles(links)
+    missing = [link for link in links if link not in contents]
+    if missing:
+        # Page downloads are network-bound, so fetch all missing articles at once
+        with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            fetched = dict(zip(missing, executor.map(fetch_article_content, missing)))
+        store_articles([(link, content) for link, content in fetched.items() if content])
+        contents.update(fetched)
+    return [contents[link] for link in links]
+
 ################################################################################
-# Article Search and Summary Generator
+# Article Search and Excerpt Generator
 ################################################################################
 
+# Characters of each article passed on to the LLM
+ARTICLE_EXCERPT_LENGTH = 1000
 def generate_response(user_query):
     """
-    Generate a response by searching for articles and summarizing their content.
+    Generate a response by searching for articles and passing on an excerpt of each one's content.
+    The excerpts are short enough to fit in the answer prompt as they are, so they are not summarized first.
     """
     articles = google_search(user_query, GOOGLE_API_KEY, GOOGLE_CSE_ID, num_results=5)
     if not articles:
         return "No relevant articles found. Please refine your query."
 
-    valid_articles = []
+    # Results can repeat a page, so fetch each URL once; results without a URL cannot be fetched at all
+    articles_by_link = {}
     for article in articles:
-        title = article["title"] or "No title"
-        link = article["link"] or "No link"
-        content = fetch_article_content(link)
+        if article["link"]:
+            articles_by_link.setdefault(article["link"], article)
+    links = list(articles_by_link)
+
+    contents = fetch_articles(links) if links else []
+
+    valid_articles = []
+    for article, link, content in zip(articles_by_link.values(), links, contents):
+        # Boilerplate is stripped before cutting the excerpt, so the excerpt is all article text
+        content = strip_boilerplate(content) if content else None
         if content:
-            summary = summarize_text(content[:1000])
-            valid_articles.append(f"Title: {title}\nURL: {link}\nSummary: {summary}")
+            valid_articles.append((article["title"] or "No title", link, content[:ARTICLE_EXCERPT_LENGTH]))
         else:
-            logging.info(f"Skipping inaccessible article: {link}")
+            logging.info("Skipping inaccessible article: %s", link)
 
     if not valid_articles:
         return "No accessible articles could be retrieved. Try another query or refine your sources."
 
-    return "\n\n".join(valid_articles)
+    return "\n\n".join(
+        f"Title: {title}\nURL: {link}\nExcerpt: {excerpt}"
+        for title, link, excerpt in valid_articles
+    )
 
 ################################################################################
 # RAG Handler
 ################################################################################
 
-def rag(text):
-    '''
-    This function uses retrieval augmented generation (RAG) to generate an LLM response to the input text.
-
-    >>> rag("")
-    'Please provide a company name or a stock symbol in your query.'
-    '''
-    if text == "":
-        return 'Please provide a company name or a stock symbol in your query.'
-    ticker = get_popular_symbol(text)
-    if ticker == 'None':
-        return 'Please provide a company name or a stock symbol in your query.'
-
-    system = """You are a professional stock analyst and advisor tasked with answering user queries based on the provided information. 
-    Do not take into account any knowledge outside of the financial data, stock recommendation, or provided article summaries in your answer.
+# Kept identical across queries so the provider can reuse its cached prefix; the retrieved data goes in the user message
+RAG_SYSTEM_PROMPT = """You are a professional stock analyst and advisor tasked with answering user queries based on the provided information. 
+    Do not take into account any knowledge outside of the financial data, stock recommendation, or provided article excerpts in your answer.
     Do not add any extra details, opinions, or unecessary explanations.
     You are not allowed to mention the source of your information. 
     Directly address the user's question via concise and accurate incorporation of relevant information.
@@ -290,25 +740,69 @@ def rag(text):
     Stop responding once you have provided the necessary answer.
     """
 
-    converted_list = ast.literal_eval(ticker)
-    for stock in converted_list:
-        print(f"Stock Ticker:\n{stock}\n")
-        quote = get_quote(stock)
-        print(f"Quote:\n{quote}\n") 
-        system += f"Quote for {stock}:\n{quote}"
-
-        recommendations = get_recommendations(stock)
-        print(f"Aggregated Analyst Ratings for {stock}:\n{recommendations}\n") 
-        system += f"Aggregated Analyst Ratings for {stock}:\n{recommendations}"
-
-    article_summaries = generate_response(text)
-    print(f"Article Summaries:\n{article_summaries}\n") 
-    system += article_summaries
+def rag(text, stream=False, verbose=True):
+    '''
+    This function uses retrieval augmented generation (RAG) to generate an LLM response to the input text.
+    If `stream` is True, the answer is also written to stdout, token by token when it comes from the LLM.
+    If `verbose` is False, the retrieved quotes, ratings and articles are not printed, e.g. when several
+    queries run concurrently and their output would interleave.
 
-    system += f"User query: {text}"
+    >>> rag("")
+    'Please provide a company name or a stock symbol in your query.'
+    '''
+    if text == "":
+        return 'Please provide a company name or a stock symbol in your query.'
 
-    print("Chatbot Answer:\n")
-    return run_llm(system, text)
+    def show(message):
+        if verbose:
+            print(message)
+
+    # A question asked before is answered straight from the on-disk cache, before even looking up its tickers
+    cached_response = load_cached_answer(text)
+    if cached_response is None:
+        converted_list = parse_tickers(get_popular_symbol(text))
+        if not converted_list:
+            response = 'Please provide a company name or a stock symbol in your query.'
+            if stream:
+                print(response)
+            return response
+        cached_response = response_cache.get(text, converted_list)
+    if cached_response is not None:
+        show("Chatbot Answer:\n")
+        if stream:
+            print(cached_response)
+        return cached_response
+
+    # Collect the context in pieces and join once rather than re-copying it on every addition
+    context_parts = []
+    # The Finnhub lookups and the article search are independent network calls, so fan them out together
+    with ThreadPoolExecutor() as executor:
+        article_future = executor.submit(generate_response, text)
+        quote_futures = [executor.submit(get_quote, stock) for stock in converted_list]
+        recommendation_futures = [executor.submit(get_recommendations, stock) for stock in converted_list]
+
+        for stock, quote_future, recommendation_future in zip(converted_list, quote_futures, recommendation_futures):
+            show(f"Stock Ticker:\n{stock}\n")
+            quote = quote_future.result()
+            show(f"Quote:\n{quote}\n")
+            context_parts.append(f"Quote for {stock}:\n{quote}")
+
+            recommendations = recommendation_future.result()
+            show(f"Aggregated Analyst Ratings for {stock}:\n{recommendations}\n")
+            context_parts.append(f"Aggregated Analyst Ratings for {stock}:\n{recommendations}")
+
+        article_excerpts = article_future.result()
+    show(f"Article Excerpts:\n{article_excerpts}\n")
+    context_parts.append(f"Article Excerpts:\n{article_excerpts}")
+
+    context_parts.append(f"User query: {text}")
+    user = "\n\n".join(context_parts)
+
+    show("Chatbot Answer:\n")
+    response = run_llm(RAG_SYSTEM_PROMPT, user, stream=stream)
+    response_cache.add(text, response, converted_list)
+    store_answer(text, response, converted_list)
+    return response
 
 
 ################################################################################
@@ -335,9 +829,9 @@ if __name__ == "__main__":
                     print("Exiting the chatbot. Goodbye!")
                     break
                 if query:
-                    response = rag(query)
-                    print(response, "\n\n---\n")
+                    rag(query, stream=True)
+                    print("\n---\n")
                 else:
                     print("Please enter a valid question or command.")
             except Exception as e:
-                logging.error(f"An unexpected error occurred: {e}")
\ No newline at end of file
+                logging.error("An unexpected error occurred: %s", e)
\ No newline at end of file
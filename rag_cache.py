@@ -0,0 +1,46 @@
+import functools
+import hashlib
+import os
+import shelve
+import threading
+import chatbot
+
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
+    from json import loads as json_loads
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+
+# rag is network-bound, so several cases can wait on the APIs at once
+MAX_WORKERS = 8
+
+# Responses from earlier test runs are saved here, so re-running the tests doesn't repeat every LLM call.
+# Set RECOMPUTE=1 to ask every question again; the fresh responses replace the saved ones.
+CACHE_PATH = "rag_responses"
+RECOMPUTE = os.getenv("RECOMPUTE") == "1"
+
+# shelve does not support concurrent access, and the tests call rag from a thread pool
+_cache_lock = threading.Lock()
+
+# Identical questions within a run are only answered once
+@functools.lru_cache(maxsize=None)
+def cached_rag(question):
+    key = hashlib.sha256(question.encode()).hexdigest()
+    if not RECOMPUTE:
+        with _cache_lock, shelve.open(CACHE_PATH) as cache:
+            if key in cache:
+                return cache[key]
+    # The tests ask several questions at once, so rag's own progress output would interleave with their results
+    response = chatbot.rag(question, verbose=False)
+    with _cache_lock, shelve.open(CACHE_PATH) as cache:
+        cache[key] = response
+    return response
+
+# Prints the accuracy over all test cases
+def report(correct_predictions, total_tests):
+    accuracy_fraction = f"{correct_predictions}/{total_tests}"
+    accuracy_percentage = (correct_predictions / total_tests) * 100
+    print(f"Accuracy: {accuracy_fraction} ({accuracy_percentage:.2f}%)")
@@ -1,55 +1,79 @@
-import json
-import chatbot
+import functools
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from rag_cache import MAX_WORKERS, cached_rag, json_dumps, json_loads, report
 
 # Load test cases from a separate JSON file
 # Make sure to update the values in the JSON value to reflect concurrent source recommendations!
-with open("test_cases1.json", "r") as f:
-    test_cases = json.load(f)
+with open("test_cases1.json", "rb") as f:
+    test_cases = json_loads(f.read())
+
+# Cases that were appended more than once would ask the same question again, so only the first copy is kept
+unique_cases = {}
+for case in test_cases:
+    unique_cases.setdefault((case["company"], case["source"], case["recommendation"]), case)
+test_cases = list(unique_cases.values())
 
-# Initialize variables for scoring
 total_tests = len(test_cases)
-correct_predictions = 0
 
-# Function to test the chatbot
+# Keywords are matched anywhere in the response, as they always have been, so scores stay comparable between runs
+NEGATIVE_KEYWORDS = ("no", "bearish", "overvalued")
+POSITIVE_KEYWORDS = ("yes", "undervalued", "bullish")
+
+@functools.lru_cache(maxsize=None)
+def recommendation_pattern(recommendation):
+    return re.compile(rf'\b{re.escape(recommendation.lower())}\b')
+
+# Each case's result is also written here as a line of JSON, so runs can be compared without parsing the printed output
+RESULTS_PATH = "results1.jsonl"
+
+def make_question(case):
+    return f"Does {case['source']} recommend {case['recommendation']} for {case['company']}?"
+
+# Returns whether the chatbot was correct on a single test case, the detailed results to print for it,
+# and the record to save for it
+def score(case, chatbot_response):
+    recommendation = case["recommendation"]
+
+    # Compare chatbot recommendation with correct recommendation
+    response = chatbot_response.lower()
+    correct = not any(keyword in response for keyword in NEGATIVE_KEYWORDS) and bool(
+        any(keyword in response for keyword in POSITIVE_KEYWORDS)
+        or recommendation_pattern(recommendation).search(response)
+    )
+
+    question = make_question(case)
+    lines = [
+        f"Question: {question}",
+        f"Chatbot Response: {chatbot_response}",
+        f"Correct Recommendation: {recommendation}",
+        "---",
+        "Accuracy Score +1" if correct else "Incorrect",
+    ]
+    record = {"question": question, "response": chatbot_response, "expected": recommendation, "correct": correct}
+    return correct, "\n".join(lines) + "\n", record
+
+# Asks a test case's question and scores the response, so scoring overlaps with the other cases' requests
+def run_case(case):
+    return score(case, cached_rag(make_question(case)))
+
+# Function to test the chatbot, returning the number of correct predictions and the number of tests
 def test_chatbot1():
-    global correct_predictions
-
-    for case in test_cases:
-        company = case["company"]
-        source = case["source"]
-        recommendation = case["recommendation"]
-
-        # Formulate the question
-        question = f"Does {source} recommend {recommendation} for {company}?"
-
-        # Get chatbot response
-        chatbot_response = chatbot.rag(question)
-
-        # Print detailed results for each test case
-        print(f"Question: {question}")
-        print(f"Chatbot Response: {chatbot_response}")
-        print(f"Correct Recommendation: {recommendation}")
-        print("---")
-
-        # Compare chatbot recommendation with correct recommendation
-        if any(keyword in chatbot_response.lower() for keyword in ["no", "bearish", "overvalued"]):
-            print("Incorrect")
-        else:
-            if any(keyword in chatbot_response.lower() for keyword in ["yes", "undervalued", "bullish"]):
-                print("Accuracy Score +1")
-                correct_predictions += 1
-            elif re.search(rf'\b{re.escape(recommendation.lower())}\b', chatbot_response.lower()):
-                print("Accuracy Score +1")
+    correct_predictions = 0
+
+    # Results come back in the order of the test cases, so the printed results stay in order
+    with open(RESULTS_PATH, "wb") as results_file, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for correct, results, record in executor.map(run_case, test_cases):
+            # Print detailed results for each test case with a single write
+            sys.stdout.write(results)
+            results_file.write(json_dumps(record) + b"\n")
+            if correct:
                 correct_predictions += 1
-            else:
-                print("Incorrect")
 
-    # Calculate and print accuracy
-    accuracy_fraction = f"{correct_predictions}/{total_tests}"
-    accuracy_percentage = (correct_predictions / total_tests) * 100
-    print(f"Accuracy: {accuracy_fraction} ({accuracy_percentage:.2f}%)")
+    report(correct_predictions, total_tests)
+    return correct_predictions, total_tests
 
 # Run the test
 if __name__ == "__main__":
-    test_chatbot1()
\ No newline at end of file
+    test_chatbot1()
@@ -1,58 +1,101 @@
-import json
-import chatbot
+import functools
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from rag_cache import MAX_WORKERS, cached_rag, json_dumps, json_loads, report
 
 # Load test cases from a separate JSON file
 # Make sure to update the values in the JSON value to reflect concurrent company challenges!
-with open("test_cases2.json", "r") as f:
-    test_cases = json.load(f)
+with open("test_cases2.json", "rb") as f:
+    test_cases = json_loads(f.read())
 
-# Function to test the chatbot
+# Each case's result is also written here as a line of JSON, so runs can be compared without parsing the printed output
+RESULTS_PATH = "results2.jsonl"
+
+def make_question(case):
+    return f"What are the most significant challenges {case['company']} is currently facing based on recent news and trends? Focus on industry-related, financial, and operational issues."
+
+# Challenges repeat across companies, so each word's pattern is compiled once and reused
+@functools.lru_cache(maxsize=None)
+def word_pattern(word):
+    return re.compile(rf'\b{re.escape(word.lower())}s?\b')
+
+# Most challenges don't appear in a response at all, so a plain substring check rules them out before the regex runs
+def mentions(response, word):
+    '''
+    Returns whether the lowercased `response` mentions `word` as a whole word, optionally plural.
+
+    >>> mentions("chips and data centers", "Chip"), mentions("chips and data centers", "data")
+    (True, True)
+    >>> mentions("a metadata leak", "data")
+    False
+    '''
+    return word.lower() in response and word_pattern(word).search(response) is not None
+
+# The patterns only depend on the test cases, so they are compiled once when the cases are loaded
+for case in test_cases:
+    for challenge in case["challenges"]:
+        for word in (challenge if isinstance(challenge, list) else [challenge]):
+            word_pattern(word)
+
+# Function to test the chatbot, returning the number of challenges found and the number of challenges
 def test_chatbot2():
-    total_tests = 0
+    # Every challenge of every case is scored once
+    total_tests = sum(len(case["challenges"]) for case in test_cases)
     correct_predictions = 0
 
-    for case in test_cases:
-        company = case["company"]
-        challenges = case["challenges"]
-
-        # Formulate the question
-        question = f"What are the most significant challenges {company} is currently facing based on recent news and trends? Focus on industry-related, financial, and operational issues."
-        
-        # Get chatbot response
-        chatbot_response = chatbot.rag(question)
-        chatbot_response = chatbot_response.strip()
-
-        # Print detailed results for each test case
-        print(f"Question: {question}")
-        print(f"Chatbot Response: {chatbot_response}")
-        print(f"Correct Challenges: {challenges}")
-        print("---")
-
-        # Compare chatbot response with correct challenges
-        for challenge in challenges:
-            total_tests += 1
-
-            # Check if the challenge is a list (synonyms)
-            if isinstance(challenge, list):
-                # Match any synonym in the list
-                if any(re.search(rf'\b{re.escape(word.lower())}s?\b', chatbot_response.lower()) for word in challenge):
-                    print(f"'{challenge}' found via synonym. Accuracy Score +1")
-                    correct_predictions += 1
-                else:
-                    print(f"'{challenge}' not found in response. Incorrect")
-            else:
-                # Handle single challenges
-                if re.search(rf'\b{re.escape(challenge.lower())}s?\b', chatbot_response.lower()):
-                    print(f"'{challenge}' found. Accuracy Score +1")
-                    correct_predictions += 1
+    # The question only depends on the company, so each distinct question is asked once
+    questions = list(dict.fromkeys(map(make_question, test_cases)))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        answers = dict(zip(questions, executor.map(cached_rag, questions)))
+
+    with open(RESULTS_PATH, "wb") as results_file:
+        for case in test_cases:
+            question = make_question(case)
+            chatbot_response = answers[question].strip()
+            challenges = case["challenges"]
+
+            # Detailed results for each test case are collected and printed with a single write
+            lines = [
+                f"Question: {question}",
+                f"Chatbot Response: {chatbot_response}",
+                f"Correct Challenges: {challenges}",
+                "---",
+            ]
+
+            # Compare chatbot response with correct challenges
+            response = chatbot_response.lower()
+            found = []
+            for challenge in challenges:
+                # Check if the challenge is a list (synonyms)
+                if isinstance(challenge, list):
+                    # Match any synonym in the list
+                    found.append(any(mentions(response, word) for word in challenge))
+                    if found[-1]:
+                        lines.append(f"'{challenge}' found via synonym. Accuracy Score +1")
+                        correct_predictions += 1
+                    else:
+                        lines.append(f"'{challenge}' not found in response. Incorrect")
                 else:
-                    print(f"'{challenge}' not found in response. Incorrect")
+                    # Handle single challenges
+                    found.append(mentions(response, challenge))
+                    if found[-1]:
+                        lines.append(f"'{challenge}' found. Accuracy Score +1")
+                        correct_predictions += 1
+                    else:
+                        lines.append(f"'{challenge}' not found in response. Incorrect")
+            sys.stdout.write("\n".join(lines) + "\n")
+
+            record = {
+                "question": question,
+                "response": chatbot_response,
+                "expected": challenges,
+                "correct": found,
+            }
+            results_file.write(json_dumps(record) + b"\n")
 
-    # Calculate and print accuracy
-    accuracy_fraction = f"{correct_predictions}/{total_tests}"
-    accuracy_percentage = (correct_predictions / total_tests) * 100
-    print(f"Accuracy: {accuracy_fraction} ({accuracy_percentage:.2f}%)")
+    report(correct_predictions, total_tests)
+    return correct_predictions, total_tests
 
 # Run the test
 if __name__ == "__main__":